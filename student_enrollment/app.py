@@ -1,17 +1,114 @@
 import os
-from flask import Flask, request, jsonify
+import json
+import base64
+import binascii
+from flask import Flask, Response, request, jsonify, g, has_request_context, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, tuple_
+from sqlalchemy.exc import TimeoutError as SQLAlchemyTimeoutError
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
 from models import db, Student
 import logging
-from datetime import datetime
+import logging.handlers
+import copy
+import queue
+import atexit
+import random
+import math
+import time
+import threading
+import uuid
+from datetime import datetime, timedelta
 
 # Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Records are handed to a background QueueListener so JSON formatting and
+# stream I/O happen off the request thread.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+LOG_SAMPLED_ROUTES = tuple(
+    route for route in os.getenv("LOG_SAMPLED_ROUTES", "/health,/validate").split(",") if route
+)
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as single-line JSON"""
+    FIELDS = ("request_id", "method", "route", "status", "duration_ms")
+
+    def format(self, record):
+        entry = {
+            "timestamp": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry)
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request id to records logged while handling a request"""
+    def filter(self, record):
+        if not hasattr(record, "request_id") and has_request_context():
+            record.request_id = getattr(g, "request_id", None)
+        return True
+
+class SnapshotQueueHandler(logging.handlers.QueueHandler):
+    """
+    Resolve the message and traceback on the calling thread, so the record
+    holds no references to request objects, and leave JSON formatting and
+    I/O to the listener thread
+    """
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def configure_logging():
+    """Route all logging through a queue drained by a background listener"""
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = SnapshotQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+
+    # log_request is the access log; silence werkzeug's unsampled per-request
+    # INFO lines while still honouring a stricter LOG_LEVEL
+    logging.getLogger("werkzeug").setLevel(max(logging.WARNING, root.level))
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize Flask app
 app = Flask(__name__)
 
+# Load shedding and deadline settings
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "64"))  # 0 disables in-flight shedding
+MAX_POOL_WAIT_MS = int(os.getenv("MAX_POOL_WAIT_MS", "500"))
+SHED_EXEMPT_ENDPOINTS = {"index", "health", "metrics"}
+
+# Change feed settings
+CHANGE_FEED_CHUNK_SIZE = int(os.getenv("CHANGE_FEED_CHUNK_SIZE", "500"))
+CHANGE_FEED_MAX_LIMIT = int(os.getenv("CHANGE_FEED_MAX_LIMIT", "10000"))
+# Must exceed the longest flush-to-commit gap of any writer
+CHANGE_FEED_SAFETY_LAG_SECONDS = float(os.getenv("CHANGE_FEED_SAFETY_LAG_SECONDS", "30"))
+
 # Configure database
 database_url = os.getenv("DATABASE_URL")
 app.config["SQLALCHEMY_DATABASE_URI"] = database_url
@@ -19,6 +116,7 @@ app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
     "pool_pre_ping": True,
+    "pool_timeout": MAX_POOL_WAIT_MS / 1000,
 }
 
 # Initialize database
@@ -27,6 +125,178 @@ db.init_app(app)
 # Create tables
 with app.app_context():
     db.create_all()
+    # create_all skips indexes on tables that already exist
+    for index in Student.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+
+@app.before_request
+def start_request_log():
+    g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def log_request(response):
+    response.headers["X-Request-ID"] = g.request_id
+    # Successful calls to noisy routes are only logged for a sample of requests
+    if not logger.isEnabledFor(logging.INFO):
+        return response
+    if (response.status_code < 500 and request.path.startswith(LOG_SAMPLED_ROUTES)
+            and random.random() >= LOG_SAMPLE_RATE):
+        return response
+    route = request.url_rule.rule if request.url_rule else request.path
+    logger.info("%s %s %s", request.method, route, response.status_code, extra={
+        "request_id": g.request_id,
+        "method": request.method,
+        "route": route,
+        "status": response.status_code,
+        "duration_ms": round((time.perf_counter() - g.request_start) * 1000, 2),
+    })
+    return response
+
+# In-flight request tracking and overload counters
+_load_lock = threading.Lock()
+_load_stats = {"in_flight": 0, "shed": 0, "expired": 0}
+
+def _bump(counter, delta=1):
+    with _load_lock:
+        _load_stats[counter] += delta
+        return _load_stats[counter]
+
+class DeadlineExceeded(Exception):
+    """Raised when a transaction would start after the caller's deadline"""
+
+def parse_deadline():
+    """
+    Read the caller's deadline from the request headers as a time.time() value.
+    X-Request-Deadline is an absolute epoch timestamp in milliseconds;
+    X-Request-Timeout is a relative budget in milliseconds. Malformed,
+    non-finite or negative values are treated as no deadline.
+    """
+    try:
+        if "X-Request-Deadline" in request.headers:
+            value = float(request.headers["X-Request-Deadline"])
+            offset = 0
+        elif "X-Request-Timeout" in request.headers:
+            value = float(request.headers["X-Request-Timeout"])
+            offset = time.time()
+        else:
+            return None
+    except ValueError:
+        return None
+    if not math.isfinite(value) or value < 0:
+        return None
+    return offset + value / 1000
+
+def deadline_exceeded():
+    """504 for requests whose deadline passed before or during handling"""
+    _bump("expired")
+    return jsonify({"error": "Request deadline exceeded"}), 504
+
+def overloaded(reason):
+    """Fast 503 for requests rejected by load shedding"""
+    _bump("shed")
+    logger.warning("Shedding request: %s", reason)
+    response = jsonify({"error": "Service overloaded", "details": reason})
+    response.status_code = 503
+    response.headers["Retry-After"] = "1"
+    return response
+
+@app.before_request
+def admit_request():
+    if request.endpoint is None or request.endpoint in SHED_EXEMPT_ENDPOINTS:
+        return None
+
+    g.deadline = parse_deadline()
+    if g.deadline is not None and g.deadline <= time.time():
+        return deadline_exceeded()
+
+    g.in_flight = True
+    if _bump("in_flight") > MAX_IN_FLIGHT > 0:
+        return overloaded("Too many requests in flight")
+
+    # Check out the request's connection up front so a saturated pool is
+    # rejected here rather than after the handler has started work
+    try:
+        db.session.connection()
+    except SQLAlchemyTimeoutError:
+        db.session.rollback()
+        return overloaded("Timed out waiting for a database connection")
+    except DeadlineExceeded:
+        g.pop("deadline_expired", None)
+        db.session.rollback()
+        return deadline_exceeded()
+    return None
+
+@app.after_request
+def report_expired_deadline(response):
+    # Handlers turn database errors into generic 500s; if the failure was the
+    # deadline running out, answer with a 504 instead. Once a write has been
+    # committed the handler's own response is kept, so callers do not retry it.
+    if g.pop("deadline_expired", False) and not g.get("committed_write"):
+        response, status = deadline_exceeded()
+        response.status_code = status
+    return response
+
+@app.teardown_request
+def release_request(exc):
+    if g.pop("in_flight", False):
+        _bump("in_flight", -1)
+
+@event.listens_for(Session, "after_begin")
+def apply_statement_timeout(session, transaction, connection):
+    """Bound every statement by the time left before the caller's deadline"""
+    if not has_request_context() or g.get("deadline") is None:
+        return
+    if connection.dialect.name != "postgresql":
+        return
+    remaining_ms = int((g.deadline - time.time()) * 1000)
+    if remaining_ms <= 0:
+        # After a committed write, let the request finish reporting it
+        if g.get("committed_write"):
+            return
+        g.deadline_expired = True
+        raise DeadlineExceeded("Request deadline exceeded")
+    # statement_timeout is a 32-bit millisecond value
+    remaining_ms = min(remaining_ms, 2**31 - 1)
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {remaining_ms}")
+
+@event.listens_for(Engine, "handle_error")
+def detect_statement_timeout(context):
+    """Flag statements cancelled by the deadline's statement_timeout"""
+    if not has_request_context() or g.get("deadline") is None:
+        return
+    # 57014 is Postgres' query_canceled
+    if getattr(context.original_exception, "pgcode", None) == "57014" and not g.get("committed_write"):
+        g.deadline_expired = True
+
+@event.listens_for(Session, "after_flush")
+def mark_pending_write(session, flush_context):
+    """Note that the open transaction contains writes"""
+    session.info["pending_write"] = True
+
+@event.listens_for(Session, "after_rollback")
+def clear_pending_write(session):
+    """Rolled-back writes were never persisted"""
+    session.info.pop("pending_write", None)
+
+@event.listens_for(Session, "after_commit")
+def mark_committed_write(session):
+    """Remember that this request has persisted data"""
+    if session.info.pop("pending_write", False) and has_request_context():
+        g.committed_write = True
+
+def encode_cursor(updated_at, row_id):
+    """Build an opaque change feed cursor from a row's (updated_at, id) key"""
+    raw = json.dumps([updated_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor"""
+    try:
+        updated_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(updated_at), int(row_id)
+    except (TypeError, binascii.Error, json.JSONDecodeError) as e:
+        raise ValueError(str(e))
 
 @app.route('/')
 def index():
@@ -36,6 +306,12 @@ def index():
 def health():
     return jsonify({"status": "healthy"})
 
+@app.route('/metrics')
+def metrics():
+    """Load shedding counters"""
+    with _load_lock:
+        return jsonify(dict(_load_stats))
+
 @app.route('/enroll', methods=['POST'])
 def enroll_student():
     """
@@ -78,7 +354,7 @@ def enroll_student():
             db.session.add(new_student)
             db.session.commit()
             
-            logger.info(f"Student enrolled: {new_student.id}")
+            logger.info("Student enrolled: %s", new_student.id)
             
             return jsonify({
                 "message": "Student enrolled successfully",
@@ -89,7 +365,7 @@ def enroll_student():
             return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
             
     except Exception as e:
-        logger.error(f"Error enrolling student: {str(e)}")
+        logger.error("Error enrolling student: %s", e)
         db.session.rollback()
         return jsonify({"error": "Failed to enroll student", "details": str(e)}), 500
 
@@ -112,7 +388,7 @@ def get_student(student_id):
         }), 200
         
     except Exception as e:
-        logger.error(f"Error retrieving student {student_id}: {str(e)}")
+        logger.error("Error retrieving student %s: %s", student_id, e)
         return jsonify({"error": "Failed to retrieve student", "details": str(e)}), 500
 
 @app.route('/students', methods=['GET'])
@@ -133,9 +409,87 @@ def list_students():
         return jsonify({"students": result}), 200
         
     except Exception as e:
-        logger.error(f"Error listing students: {str(e)}")
+        logger.error("Error listing students: %s", e)
         return jsonify({"error": "Failed to retrieve students", "details": str(e)}), 500
 
+@app.route('/students/changes', methods=['GET'])
+def list_student_changes():
+    """
+    Stream students changed since a cursor, ordered by (updated_at, id)
+    Query parameters:
+        since: cursor returned by a previous call (omit to start from the beginning)
+        limit: maximum number of rows to return (default and maximum CHANGE_FEED_MAX_LIMIT)
+    Pass the returned cursor as `since` to resume; has_more is true when the
+    limit was reached and another page may be waiting. Rows updated within the
+    last CHANGE_FEED_SAFETY_LAG_SECONDS are held back, because updated_at is
+    stamped at flush time and a slower transaction may still commit an earlier
+    stamp. Deleted students never appear in the feed.
+    If a database error interrupts the stream, the body ends with an "error"
+    member and the cursor of the last row sent.
+    """
+    try:
+        since = request.args.get('since')
+        try:
+            last_key = decode_cursor(since) if since else None
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+        limit = request.args.get('limit', CHANGE_FEED_MAX_LIMIT, type=int)
+        if limit < 1:
+            return jsonify({"error": "limit must be a positive integer"}), 400
+        limit = min(limit, CHANGE_FEED_MAX_LIMIT)
+
+        # updated_at is written from the application clock, so bound it the same way
+        upper_bound = datetime.utcnow() - timedelta(seconds=CHANGE_FEED_SAFETY_LAG_SECONDS)
+
+        def fetch_chunk(key, size):
+            query = Student.query.filter(Student.updated_at < upper_bound).order_by(Student.updated_at, Student.id)
+            if key is not None:
+                query = query.filter(tuple_(Student.updated_at, Student.id) > key)
+            return query.limit(size).all()
+
+        # Run the first query before streaming so early failures still get a 500
+        first_batch = fetch_chunk(last_key, min(CHANGE_FEED_CHUNK_SIZE, limit))
+
+        def generate():
+            key = last_key
+            sent = 0
+            batch = first_batch
+            error = None
+            yield '{"students": ['
+            try:
+                while True:
+                    for student in batch:
+                        row = student.to_dict()
+                        row["updated_at"] = student.updated_at.isoformat()
+                        yield ("," if sent else "") + json.dumps(row)
+                        sent += 1
+
+                    if batch:
+                        key = (batch[-1].updated_at, batch[-1].id)
+                    # Keep the session from accumulating every streamed row
+                    db.session.expunge_all()
+                    if len(batch) < CHANGE_FEED_CHUNK_SIZE or sent >= limit:
+                        break
+                    batch = fetch_chunk(key, min(CHANGE_FEED_CHUNK_SIZE, limit - sent))
+            except Exception as e:
+                logger.error("Error streaming student changes: %s", e)
+                db.session.rollback()
+                error = "Failed to retrieve student changes"
+
+            cursor = encode_cursor(*key) if key is not None else None
+            tail = {"cursor": cursor, "has_more": error is not None or sent == limit}
+            if error:
+                tail["error"] = error
+            yield '], ' + json.dumps(tail)[1:]
+
+        return Response(stream_with_context(generate()), mimetype="application/json")
+
+    except Exception as e:
+        logger.error("Error streaming student changes: %s", e)
+        db.session.rollback()
+        return jsonify({"error": "Failed to retrieve student changes", "details": str(e)}), 500
+
 @app.route('/validate/<int:student_id>', methods=['GET'])
 def validate_student(student_id):
     """Validate if a student exists - used by other microservices"""
@@ -152,7 +506,7 @@ def validate_student(student_id):
         }), 200
         
     except Exception as e:
-        logger.error(f"Error validating student {student_id}: {str(e)}")
+        logger.error("Error validating student %s: %s", student_id, e)
         return jsonify({"valid": False, "error": str(e)}), 500
 
 if __name__ == '__main__':
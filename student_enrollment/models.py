@@ -6,6 +6,10 @@ db = SQLAlchemy()
 class Student(db.Model):
     """Student model for enrollment"""
     __tablename__ = 'students'
+    __table_args__ = (
+        # Keyset index for the /students/changes feed
+        db.Index('ix_students_updated_at_id', 'updated_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(100), nullable=False)
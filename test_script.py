@@ -90,6 +90,153 @@ def test_user_logins():
         except AssertionError as e:
             logger.error(f"❌ Assertion failed for {user['username']}: {str(e)}")
 
+def test_bulk_user_registration():
+    """Test bulk registration with a mixed batch, sent as a JSON array and as NDJSON"""
+    suffix = str(int(time.time() * 1000))
+    new_user = {
+        "username": f"bulk_instructor_{suffix}",
+        "password": "BulkPass@123",
+        "email": f"bulk_instructor_{suffix}@example.com",
+        "role": "instructor"
+    }
+    users = [
+        new_user,
+        dict(new_user, email=f"bulk_duplicate_{suffix}@example.com"),
+        {
+            "username": "admin_test",
+            "password": "AdminPass@123",
+            "email": f"bulk_admin_{suffix}@example.com",
+            "role": "admin"
+        },
+        dict(new_user, username=["not", "a", "string"]),
+        dict(new_user, username="x" * 51, email=f"bulk_long_{suffix}@example.com")
+    ]
+
+    logger.info("📦 Testing bulk user registration...")
+    try:
+        response = requests.post(f"{USER_REGISTRATION_SERVICE}/register-user/bulk", json=users)
+        assert response.status_code == 207, f"Expected status 207, got {response.status_code}"
+
+        statuses = [result["status"] for result in response.json()["results"]]
+        assert statuses == ["created", "invalid", "conflict", "invalid", "invalid"], f"Unexpected row results: {statuses}"
+        logger.info(f"✅ Mixed bulk batch returned per-row results: {statuses}")
+
+        ndjson_user = dict(new_user, username=f"bulk_ndjson_{suffix}", email=f"bulk_ndjson_{suffix}@example.com")
+        response = requests.post(
+            f"{USER_REGISTRATION_SERVICE}/register-user/bulk",
+            data=json.dumps(ndjson_user) + "\n",
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 201, f"Expected status 201, got {response.status_code}"
+        assert response.json()["created"] == 1, f"Unexpected NDJSON result: {response.json()}"
+        logger.info("✅ NDJSON bulk registration successful")
+
+        login_data = {"username": ndjson_user["username"], "password": ndjson_user["password"]}
+        login_response = requests.post(f"{USER_REGISTRATION_SERVICE}/login", json=login_data)
+        assert login_response.status_code == 200, f"Login failed for bulk user: {login_response.json()}"
+        logger.info("✅ Login successful for bulk registered user")
+        return True
+
+    except requests.RequestException as e:
+        logger.error(f"❌ Error during bulk registration: {str(e)}")
+        return False
+    except AssertionError as e:
+        logger.error(f"❌ Bulk registration assertion failed: {str(e)}")
+        return False
+
+def test_deadlines_and_metrics():
+    """Test that expired deadlines are rejected with 504 and counted in /metrics"""
+    services = {
+        "Student Enrollment": (STUDENT_ENROLLMENT_SERVICE, "/students"),
+        "User Registration": (USER_REGISTRATION_SERVICE, "/users")
+    }
+
+    logger.info("⏱️ Testing deadline propagation...")
+    all_passed = True
+
+    for service_name, (base_url, path) in services.items():
+        try:
+            expired_before = requests.get(f"{base_url}/metrics").json()["expired"]
+
+            # A deadline of 1 second after the epoch has long since passed
+            response = requests.get(f"{base_url}{path}", headers={"X-Request-Deadline": "1000"})
+            assert response.status_code == 504, f"Expected status 504, got {response.status_code}"
+
+            expired_after = requests.get(f"{base_url}/metrics").json()["expired"]
+            assert expired_after > expired_before, f"expired counter did not increase ({expired_before} -> {expired_after})"
+
+            # Non-finite budgets are ignored rather than failing the request
+            response = requests.get(f"{base_url}{path}", headers={"X-Request-Timeout": "nan"})
+            assert response.status_code == 200, f"Expected status 200 for a NaN timeout, got {response.status_code}"
+
+            logger.info(f"✅ {service_name} rejects expired deadlines and counts them")
+
+        except requests.RequestException as e:
+            logger.error(f"❌ Error testing deadlines for {service_name}: {str(e)}")
+            all_passed = False
+        except AssertionError as e:
+            logger.error(f"❌ Deadline assertion failed for {service_name}: {str(e)}")
+            all_passed = False
+
+    return all_passed
+
+def test_change_feeds():
+    """Test paging through the student and user change feeds until they are drained"""
+    feeds = {
+        "students": f"{STUDENT_ENROLLMENT_SERVICE}/students/changes",
+        "users": f"{USER_REGISTRATION_SERVICE}/users/changes"
+    }
+
+    logger.info("🔄 Testing change feeds...")
+    all_passed = True
+
+    for key, url in feeds.items():
+        try:
+            cursor = None
+            seen_ids = set()
+            last_position = None
+            pages = 0
+
+            while True:
+                params = {"limit": 2}
+                if cursor:
+                    params["since"] = cursor
+                response = requests.get(url, params=params)
+                assert response.status_code == 200, f"Expected status 200, got {response.status_code}"
+
+                page = response.json()
+                assert "error" not in page, f"Feed reported an error: {page['error']}"
+                for row in page[key]:
+                    position = (row["updated_at"], row["id"])
+                    assert last_position is None or position > last_position, f"Rows out of order at {position}"
+                    assert row["id"] not in seen_ids, f"Row {row['id']} returned twice"
+                    seen_ids.add(row["id"])
+                    last_position = position
+
+                pages += 1
+                if not page["has_more"]:
+                    break
+                assert page["cursor"], "has_more was true without a cursor"
+                cursor = page["cursor"]
+
+            # Resuming from the final cursor only returns rows after it
+            if cursor:
+                response = requests.get(url, params={"since": cursor})
+                assert response.status_code == 200, f"Expected status 200, got {response.status_code}"
+                for row in response.json()[key]:
+                    assert (row["updated_at"], row["id"]) > last_position, f"Resumed feed repeated row {row['id']}"
+
+            logger.info(f"✅ /{key}/changes returned {len(seen_ids)} rows over {pages} pages")
+
+        except requests.RequestException as e:
+            logger.error(f"❌ Error reading /{key}/changes: {str(e)}")
+            all_passed = False
+        except AssertionError as e:
+            logger.error(f"❌ Change feed assertion failed for /{key}/changes: {str(e)}")
+            all_passed = False
+
+    return all_passed
+
 def test_complete_flow():
     """Test the complete flow from user registration to content delivery"""
     # Step 1: Register an admin user
@@ -300,6 +447,9 @@ if __name__ == "__main__":
 
     if test_health_endpoints():
         test_user_logins()  # New user login test step
+        test_bulk_user_registration()
+        test_deadlines_and_metrics()
+        test_change_feeds()
         test_complete_flow()
     else:
         logger.error("❌ Service health check failed. Please ensure all microservices are running.")
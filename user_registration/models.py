@@ -6,6 +6,10 @@ db = SQLAlchemy()
 class User(db.Model):
     """User model for instructors and administrators"""
     __tablename__ = 'users'
+    __table_args__ = (
+        # Keyset index for the /users/changes feed
+        db.Index('ix_users_updated_at_id', 'updated_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
@@ -0,0 +1,51 @@
+"""
+Process pool for bulk password hashing.
+
+The hashing workers import this module, so it must stay free of import-time
+side effects: no logging setup, no Flask app, no database access.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor(max_workers):
+    """Lazily create the shared process pool"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Never fork the serving process: its log listener and server
+            # threads may hold locks at fork time
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                # Preload only this module, not the Flask app in __main__
+                multiprocessing.set_forkserver_preload([__name__])
+                context = multiprocessing.get_context("forkserver")
+            else:
+                context = multiprocessing.get_context("spawn")
+            _executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+        return _executor
+
+def _discard_executor(executor):
+    """Drop a broken pool so the next call starts a fresh one"""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+def hash_passwords(passwords, max_workers):
+    """Hash passwords in parallel, returning the hashes in input order"""
+    if len(passwords) <= 1 or max_workers <= 1:
+        return [generate_password_hash(password) for password in passwords]
+
+    executor = _get_executor(max_workers)
+    chunksize = max(1, len(passwords) // (max_workers * 4))
+    try:
+        return list(executor.map(generate_password_hash, passwords, chunksize=chunksize))
+    except BrokenProcessPool:
+        _discard_executor(executor)
+        raise